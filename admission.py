@@ -0,0 +1,238 @@
+"""
+Admission control for expensive routes
+Per-client token buckets limit request rates, and concurrency caps sized
+against the database pool, per route and shared by all guarded routes, shed
+load with 503 Retry-After once a request has waited longer than the queue
+budget for a slot
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import g, jsonify, request
+
+DEFAULT_POOL_SIZE = 5  # SQLAlchemy QueuePool defaults
+DEFAULT_MAX_OVERFLOW = 10
+MIN_CONCURRENCY = 4  # so one slow request does not shed every concurrent one
+SAMPLE_WINDOW = 2048  # recent samples kept per route for percentiles
+REDIS_TIMEOUT = 0.1  # seconds; a slow store must not stall every guarded request
+STORE_ERROR_LOG_INTERVAL = 60  # seconds between warnings while the shared store is down
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process; each worker limits independently"""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            if len(self._buckets) >= self.max_entries and key not in self._buckets:
+                self._prune(now)
+            self._buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, now):
+        # Buckets idle long enough to have refilled carry no state worth keeping
+        idle = [key for key, (_, last) in self._buckets.items() if now - last > 60]
+        for key in idle:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_entries:
+            self._buckets.clear()
+
+
+class RedisBucketStore:
+    """Token buckets shared by all workers through Redis (needs the redis package)"""
+
+    SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT,
+                                            socket_connect_timeout=REDIS_TIMEOUT)
+        self._take = self._client.register_script(self.SCRIPT)
+
+    def take(self, key, rate, burst):
+        allowed, tokens = self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()])
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / rate
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.in_flight = 0
+        self.queue_wait_ms = deque(maxlen=SAMPLE_WINDOW)
+        self.latency_ms = deque(maxlen=SAMPLE_WINDOW)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counts': dict(self.counts),
+                'in_flight': self.in_flight,
+                'queue_wait_ms': _percentiles(self.queue_wait_ms),
+                'latency_ms': _percentiles(self.latency_ms)
+            }
+
+
+def _percentiles(samples):
+    values = sorted(samples)
+    if not values:
+        return {}
+    return {f'p{p}': round(values[min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1)], 2)
+            for p in (50, 95, 99)}
+
+
+class AdmissionController:
+    def __init__(self, app=None):
+        self.routes = {}
+        self.metrics = {}
+        self._store_error_logged = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ADMISSION_ENABLED', True)
+        self.queue_timeout = app.config.get('ADMISSION_QUEUE_TIMEOUT', 0.5)
+        self.client_key = app.config.get('ADMISSION_CLIENT_KEY') or (lambda req: req.remote_addr)
+        store_url = app.config.get('RATE_LIMIT_STORE_URL')
+        # The local store is also the fallback while a shared store is unreachable
+        self.local_store = MemoryBucketStore()
+        self.store = RedisBucketStore(store_url) if store_url else self.local_store
+
+        # Guarded routes together may use up to half the pool, leaving the rest
+        # for cheap requests, and each route by default half of that
+        engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        pool_capacity = engine_options.get('pool_size', DEFAULT_POOL_SIZE) + \
+            engine_options.get('max_overflow', DEFAULT_MAX_OVERFLOW)
+        self.total_concurrency = app.config.get('ADMISSION_TOTAL_CONCURRENCY') or \
+            max(MIN_CONCURRENCY, pool_capacity // 2)
+        self.shared_slots = threading.BoundedSemaphore(self.total_concurrency)
+        self.default_concurrency = max(MIN_CONCURRENCY, self.total_concurrency // 2)
+        for endpoint, options in app.config.get('ADMISSION_ROUTES', {}).items():
+            self.configure(endpoint, **options)
+
+        app.extensions['admission'] = self
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+
+    def configure(self, endpoint, concurrency=None, rate=None, burst=None):
+        """Guard endpoint with a concurrency cap and, if rate is set, a per-client token bucket"""
+        concurrency = concurrency or self.default_concurrency
+        self.routes[endpoint] = {
+            'slots': threading.BoundedSemaphore(concurrency),
+            'concurrency': concurrency,
+            'rate': rate,
+            'burst': burst or (max(1, int(rate * 5)) if rate else None)
+        }
+        # Created here, before any request, so request threads only ever read the dict
+        self.metrics[endpoint] = RouteMetrics()
+
+    def _take(self, key, rate, burst):
+        """Take a token from the configured store, failing open to the local store on errors"""
+        try:
+            return self.store.take(key, rate, burst)
+        except Exception:
+            if self.store is self.local_store:
+                raise
+            now = time.monotonic()
+            if now - self._store_error_logged > STORE_ERROR_LOG_INTERVAL:
+                self._store_error_logged = now
+                logger.warning("Rate limit store unavailable, using per-process buckets", exc_info=True)
+            return self.local_store.take(key, rate, burst)
+
+    def _reject(self, status, code, message, retry_after):
+        response = jsonify({'error': message, 'code': code})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+    def _admit(self):
+        route = self.routes.get(request.endpoint) if self.enabled else None
+        if route is None:
+            return None
+        metrics = self.metrics[request.endpoint]
+
+        if route['rate']:
+            client = self.client_key(request) or 'unknown'
+            allowed, retry_after = self._take(f"{request.endpoint}:{client}", route['rate'], route['burst'])
+            if not allowed:
+                with metrics.lock:
+                    metrics.counts['rate_limited'] += 1
+                return self._reject(429, 'rate_limited', 'Too many requests, slow down', retry_after)
+
+        # The route slot is taken first, so requests queued behind a busy route hold no shared slot
+        start = time.perf_counter()
+        if not route['slots'].acquire(timeout=self.queue_timeout):
+            return self._shed(metrics)
+        if not self.shared_slots.acquire(timeout=max(0.0, start + self.queue_timeout - time.perf_counter())):
+            route['slots'].release()
+            return self._shed(metrics)
+
+        admitted = time.perf_counter()
+        g.admission = (route, admitted)
+        with metrics.lock:
+            metrics.counts['admitted'] += 1
+            metrics.in_flight += 1
+            metrics.queue_wait_ms.append((admitted - start) * 1000)
+        return None
+
+    def _shed(self, metrics):
+        with metrics.lock:
+            metrics.counts['shed'] += 1
+        return self._reject(503, 'overloaded', 'Server is busy, try again shortly', self.queue_timeout)
+
+    def _release(self, exc=None):
+        admission = g.pop('admission', None)
+        if admission is None:
+            return
+        route, admitted = admission
+        self.shared_slots.release()
+        route['slots'].release()
+        metrics = self.metrics[request.endpoint]
+        with metrics.lock:
+            metrics.in_flight -= 1
+            metrics.latency_ms.append((time.perf_counter() - admitted) * 1000)
+
+    def snapshot(self):
+        routes = {
+            endpoint: {'concurrency': route['concurrency'], 'rate': route['rate'], 'burst': route['burst'],
+                       **self.metrics[endpoint].snapshot()}
+            for endpoint, route in self.routes.items()
+        }
+        return {
+            'concurrency': self.total_concurrency,
+            'in_flight': sum(route['in_flight'] for route in routes.values()),
+            'routes': routes
+        }
@@ -0,0 +1,201 @@
+"""
+Reporting queries for UENR Student Management System
+Grouping, histograms and percentiles are computed in SQL, so each report
+fetches one row per group instead of every grade
+"""
+
+from sqlalchemy import Integer, case, cast, distinct, extract, func, select, tuple_
+from sqlalchemy.dialects.postgresql import array
+
+from caching import TTLCache
+from extensions import db
+from models import Department, Program, Student, Course, Enrollment, Grade
+
+PASS_MARK = 50
+ANALYTICS_CACHE_TTL = 300  # seconds
+SCORE_BINS = list(range(0, 110, 10))
+PERCENTILES = (10, 25, 50, 75, 90)
+
+_cache = TTLCache(ANALYTICS_CACHE_TTL)
+
+
+def cached(key, loader):
+    """Return the cached result for key (which includes the term), calling loader on a miss.
+    Reports may lag writes by up to ANALYTICS_CACHE_TTL seconds."""
+    return _cache.get(key, loader)
+
+
+def _term_filter(query, model, academic_year=None, semester=None):
+    if academic_year:
+        query = query.where(model.academic_year == academic_year)
+    if semester:
+        query = query.where(model.semester == semester)
+    return query
+
+
+def enrollment_counts(academic_year=None, semester=None):
+    """
+    Enrollment and distinct student counts per department, per program and
+    per level, plus a grand total, from a single GROUPING SETS query
+    """
+    query = (
+        select(
+            Department.id.label('department_id'),
+            Department.name.label('department_name'),
+            Program.id.label('program_id'),
+            Program.name.label('program_name'),
+            Student.level,
+            func.grouping(Department.id, Program.id, Student.level).label('grouping'),
+            func.count(Enrollment.id).label('enrollments'),
+            func.count(distinct(Enrollment.student_id)).label('students')
+        )
+        .select_from(Enrollment)
+        .join(Student, Enrollment.student_id == Student.id)
+        .join(Program, Student.program_id == Program.id)
+        .join(Department, Program.department_id == Department.id)
+        .group_by(func.grouping_sets(
+            tuple_(Department.id, Department.name),
+            tuple_(Department.id, Department.name, Program.id, Program.name),
+            tuple_(Student.level),
+            tuple_()
+        ))
+    )
+    query = _term_filter(query, Enrollment, academic_year, semester)
+
+    report = {'by_department': [], 'by_program': [], 'by_level': [], 'total': None}
+    for row in db.session.execute(query):
+        counts = {'enrollments': row.enrollments, 'students': row.students}
+        # grouping() sets a bit for each column rolled up, in argument order
+        if row.grouping == 0b011:
+            report['by_department'].append(
+                {'department_id': row.department_id, 'department_name': row.department_name, **counts})
+        elif row.grouping == 0b001:
+            report['by_program'].append({'department_id': row.department_id, 'program_id': row.program_id,
+                                         'program_name': row.program_name, **counts})
+        elif row.grouping == 0b110:
+            report['by_level'].append({'level': row.level, **counts})
+        else:
+            report['total'] = counts
+    return report
+
+
+def grade_distribution(course_id=None, academic_year=None, semester=None):
+    """
+    Score histogram, percentiles and letter grades per course. Each course's
+    statistics come back as one aggregate row: width_bucket() assigns the
+    histogram bins and percentile_cont() matches NumPy's linear percentiles.
+    """
+    bins = len(SCORE_BINS) - 1
+    # width_bucket puts a score equal to the upper bound in bucket bins + 1;
+    # least() folds it into the last bin, which is closed like np.histogram's
+    bucket = func.least(func.width_bucket(Grade.score, SCORE_BINS[0], SCORE_BINS[-1], bins), bins)
+    query = (
+        select(
+            Grade.course_id,
+            Course.course_code,
+            func.count().label('count'),
+            func.avg(Grade.score).label('mean'),
+            func.stddev_pop(Grade.score).label('std'),
+            func.min(Grade.score).label('min'),
+            func.max(Grade.score).label('max'),
+            func.percentile_cont(array([p / 100 for p in PERCENTILES]))
+            .within_group(Grade.score).label('percentiles'),
+            func.count().filter(Grade.score >= PASS_MARK).label('passed'),
+            *[func.count().filter(bucket == i).label(f'bin_{i}') for i in range(1, bins + 1)]
+        )
+        .select_from(Grade)
+        .join(Course, Grade.course_id == Course.id)
+        .group_by(Grade.course_id, Course.course_code)
+        .order_by(Grade.course_id)
+        .execution_options(include_inactive=True)
+    )
+    if course_id:
+        query = query.where(Grade.course_id == course_id)
+    query = _term_filter(query, Grade, academic_year, semester)
+
+    letters = _term_filter(
+        select(Grade.course_id, Grade.grade, func.count()).group_by(Grade.course_id, Grade.grade),
+        Grade, academic_year, semester
+    )
+    if course_id:
+        letters = letters.where(Grade.course_id == course_id)
+    letter_counts = {}
+    for cid, letter, count in db.session.execute(letters):
+        letter_counts.setdefault(cid, {})[letter] = count
+
+    return [
+        {
+            'course_id': row.course_id,
+            'course_code': row.course_code,
+            'grades': letter_counts.get(row.course_id, {}),
+            'count': row.count,
+            'mean': round(float(row.mean), 2),
+            'std': round(float(row.std), 2),
+            'min': float(row.min),
+            'max': float(row.max),
+            'percentiles': {str(p): round(float(v), 2) for p, v in zip(PERCENTILES, row.percentiles)},
+            'histogram': {'bins': SCORE_BINS,
+                          'counts': [row._mapping[f'bin_{i}'] for i in range(1, bins + 1)]},
+            'pass_rate': round(row.passed / row.count, 4)
+        }
+        for row in db.session.execute(query)
+    ]
+
+
+def pass_rates(academic_year=None, semester=None):
+    """Pass rate per course, computed entirely in SQL"""
+    passed = func.sum(case((Grade.score >= PASS_MARK, 1), else_=0))
+    query = (
+        select(Course.id, Course.course_code, Course.title,
+               func.count(Grade.id).label('graded'), passed.label('passed'))
+        .join(Grade, Grade.course_id == Course.id)
+        .group_by(Course.id, Course.course_code, Course.title)
+        .order_by(Course.course_code)
+        .execution_options(include_inactive=True)
+    )
+    query = _term_filter(query, Grade, academic_year, semester)
+    return [
+        {
+            'course_id': row.id,
+            'course_code': row.course_code,
+            'course_title': row.title,
+            'graded': row.graded,
+            'passed': row.passed,
+            'pass_rate': round(row.passed / row.graded, 4) if row.graded else None
+        }
+        for row in db.session.execute(query)
+    ]
+
+
+def cohort_retention():
+    """
+    For each admission year, the share of the cohort still enrolling in
+    each following academic year (year 0 is the admission year)
+    """
+    cohort = extract('year', Student.admission_date).label('cohort')
+    sizes = dict(db.session.execute(
+        select(cohort, func.count(Student.id)).group_by(cohort)
+    ).all())
+
+    start_year = cast(func.substr(Enrollment.academic_year, 1, 4), Integer)
+    year_offset = (start_year - extract('year', Student.admission_date)).label('year')
+    query = (
+        select(cohort, year_offset, func.count(distinct(Enrollment.student_id)).label('students'))
+        .select_from(Enrollment)
+        .join(Student, Enrollment.student_id == Student.id)
+        .group_by(cohort, year_offset)
+        .order_by(cohort, year_offset)
+    )
+
+    report = {}
+    for row in db.session.execute(query):
+        if row.cohort is None or row.year is None or row.year < 0:
+            continue
+        key = int(row.cohort)
+        entry = report.setdefault(key, {'cohort': key, 'size': sizes.get(row.cohort, 0), 'years': []})
+        entry['years'].append({
+            'year': int(row.year),
+            'students': row.students,
+            'retention': round(row.students / entry['size'], 4) if entry['size'] else None
+        })
+    return list(report.values())
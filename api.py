@@ -0,0 +1,569 @@
+# api.py - JSON API blueprint
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+
+import statements
+from caching import TTLCache
+from extensions import db
+from idempotency import idempotent
+from models import Student, Instructor, Course, Enrollment, Grade
+from tenancy import fan_out
+
+api = Blueprint('api', __name__, url_prefix='/api')
+
+# Constraint violations mapped to typed responses, so writes can insert
+# directly instead of checking for duplicates first
+CONSTRAINT_ERRORS = {
+    'students_student_id_key': ('duplicate_student_id', 'Student ID already exists'),
+    'students_email_key': ('duplicate_email', 'Email already exists'),
+    'courses_course_code_key': ('duplicate_course_code', 'Course code already exists'),
+    'enrollments_student_id_course_id_semester_academic_year_key': (
+        'duplicate_enrollment', 'Student already enrolled in this course for this semester'),
+    'grades_student_id_course_id_semester_academic_year_key': (
+        'duplicate_grade', 'Grade already recorded for this student, course and semester'),
+}
+
+
+def integrity_error_response(error):
+    """409 for unique violations, 400 for missing references, from the driver's error details"""
+    db.session.rollback()
+    diag = getattr(error.orig, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None)
+    if constraint in CONSTRAINT_ERRORS:
+        code, message = CONSTRAINT_ERRORS[constraint]
+        return jsonify({'error': message, 'code': code}), 409
+    if getattr(diag, 'sqlstate', None) == '23503':  # foreign_key_violation, in psycopg2 and psycopg 3
+        return jsonify({'error': 'Referenced record does not exist', 'code': 'invalid_reference',
+                        'constraint': constraint}), 400
+    return jsonify({'error': 'Record conflicts with existing data', 'code': 'conflict',
+                    'constraint': constraint}), 409
+
+
+# API Routes
+
+# Dashboard endpoints
+def _dashboard_counts():
+    return {
+        'students': Student.query.count(),
+        'courses': Course.query.count(),
+        'faculty': Instructor.query.count(),
+        'enrollments': Enrollment.query.filter_by(status='Enrolled').count()
+    }
+
+
+@api.route('/dashboard')
+def get_dashboard_stats():
+    try:
+        stats = {
+            **_dashboard_counts(),
+            'recent_students': [s.to_dict() for s in db.session.scalars(statements.RECENT_STUDENTS)],
+            'recent_courses': [c.to_dict() for c in db.session.scalars(statements.RECENT_COURSES)]
+        }
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/campuses/dashboard')
+def get_campus_dashboard():
+    """Counts for every campus, queried in parallel, plus totals"""
+    try:
+        campuses = fan_out(_dashboard_counts)
+        totals = {key: sum(counts[key] for counts in campuses.values())
+                  for key in ('students', 'courses', 'faculty', 'enrollments')}
+        return jsonify({'campuses': campuses, 'totals': totals})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Student CRUD endpoints
+@api.route('/students', methods=['GET'])
+def get_students():
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 10, type=int)
+        search = request.args.get('search', '')
+        program_id = request.args.get('program_id', type=int)
+
+        params = {'pattern': statements.like_contains(search), 'program_id': program_id}
+        students = statements.paginate(
+            statements.student_list(bool(search), bool(program_id)), params, page, per_page
+        )
+
+        return jsonify({
+            'students': [s.to_dict() for s in students.pop('items')],
+            **students
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/students', methods=['POST'])
+@idempotent
+def create_student():
+    try:
+        data = request.get_json()
+
+        # Duplicate student IDs and emails are reported by integrity_error_response
+        student = Student(
+            student_id=data['student_id'],
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            email=data['email'],
+            phone=data.get('phone'),
+            program_id=data['program_id'],
+            level=data['level'],
+            status=data.get('status', 'Active')
+        )
+
+        db.session.add(student)
+        db.session.commit()
+        invalidate_options_cache()
+
+        return jsonify({'message': 'Student created successfully', 'student': student.to_dict()}), 201
+    except IntegrityError as e:
+        return integrity_error_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/students/<int:student_id>', methods=['GET'])
+def get_student(student_id):
+    try:
+        student = Student.query.get_or_404(student_id)
+        return jsonify(student.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/students/<int:student_id>', methods=['PUT'])
+def update_student(student_id):
+    try:
+        student = Student.query.get_or_404(student_id)
+        data = request.get_json()
+
+        # Update fields
+        for field in ['first_name', 'last_name', 'email', 'phone', 'program_id', 'level', 'status']:
+            if field in data:
+                setattr(student, field, data[field])
+
+        student.updated_at = datetime.utcnow()
+        db.session.commit()
+        invalidate_options_cache()
+
+        return jsonify({'message': 'Student updated successfully', 'student': student.to_dict()})
+    except IntegrityError as e:
+        return integrity_error_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/students/<int:student_id>', methods=['DELETE'])
+def delete_student(student_id):
+    try:
+        student = Student.query.get_or_404(student_id)
+        db.session.delete(student)
+        db.session.commit()
+        invalidate_options_cache()
+        return jsonify({'message': 'Student deleted successfully'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# Course CRUD endpoints
+@api.route('/courses', methods=['GET'])
+def get_courses():
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 10, type=int)
+        search = request.args.get('search', '')
+        department_id = request.args.get('department_id', type=int)
+
+        if request.args.get('include_archived', 'false').lower() == 'true':
+            from archive import list_courses_with_archived
+            return jsonify(list_courses_with_archived(search, department_id, page, per_page))
+
+        params = {'pattern': statements.like_contains(search), 'department_id': department_id}
+        courses = statements.paginate(
+            statements.course_list(bool(search), bool(department_id)), params, page, per_page
+        )
+
+        return jsonify({
+            'courses': [c.to_dict() for c in courses.pop('items')],
+            **courses
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/courses', methods=['POST'])
+@idempotent
+def create_course():
+    try:
+        data = request.get_json()
+
+        course = Course(
+            course_code=data['course_code'],
+            title=data['title'],
+            description=data.get('description'),
+            credits=data['credits'],
+            department_id=data['department_id'],
+            instructor_id=data.get('instructor_id'),
+            level=data['level'],
+            semester=data.get('semester', 'First')
+        )
+
+        db.session.add(course)
+        db.session.commit()
+        invalidate_options_cache()
+
+        return jsonify({'message': 'Course created successfully', 'course': course.to_dict()}), 201
+    except IntegrityError as e:
+        return integrity_error_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/courses/<int:course_id>', methods=['PUT'])
+def update_course(course_id):
+    try:
+        course = Course.query.get_or_404(course_id)
+        data = request.get_json()
+
+        # Update fields
+        for field in ['title', 'description', 'credits', 'department_id', 'instructor_id', 'level', 'semester']:
+            if field in data:
+                setattr(course, field, data[field])
+
+        course.updated_at = datetime.utcnow()
+        db.session.commit()
+        invalidate_options_cache()
+
+        return jsonify({'message': 'Course updated successfully', 'course': course.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/courses/<int:course_id>', methods=['DELETE'])
+def delete_course(course_id):
+    try:
+        course = Course.query.get_or_404(course_id)
+        course.is_active = False  # Soft delete
+        db.session.commit()
+        invalidate_options_cache()
+        return jsonify({'message': 'Course deleted successfully'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# Enrollment endpoints
+@api.route('/enrollments', methods=['GET'])
+def get_enrollments():
+    try:
+        student_id = request.args.get('student_id', type=int)
+        course_id = request.args.get('course_id', type=int)
+
+        if request.args.get('include_archived', 'false').lower() == 'true':
+            from archive import list_enrollments_with_archived
+            return jsonify(list_enrollments_with_archived(student_id, course_id))
+
+        enrollments = db.session.scalars(
+            statements.enrollment_list(bool(student_id), bool(course_id)),
+            {'student_id': student_id, 'course_id': course_id}
+        )
+        return jsonify([e.to_dict() for e in enrollments])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/enrollments', methods=['POST'])
+@idempotent
+def create_enrollment():
+    try:
+        data = request.get_json()
+
+        enrollment = Enrollment(
+            student_id=data['student_id'],
+            course_id=data['course_id'],
+            semester=data['semester'],
+            academic_year=data['academic_year'],
+            status=data.get('status', 'Enrolled')
+        )
+
+        db.session.add(enrollment)
+        db.session.commit()
+
+        return jsonify({'message': 'Enrollment created successfully', 'enrollment': enrollment.to_dict()}), 201
+    except IntegrityError as e:
+        return integrity_error_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# Grade endpoints
+@api.route('/grades', methods=['GET'])
+def get_grades():
+    try:
+        student_id = request.args.get('student_id', type=int)
+        course_id = request.args.get('course_id', type=int)
+
+        grades = db.session.scalars(
+            statements.grade_list(bool(student_id), bool(course_id)),
+            {'student_id': student_id, 'course_id': course_id}
+        )
+        return jsonify([g.to_dict() for g in grades])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/grades', methods=['POST'])
+@idempotent
+def create_grade():
+    try:
+        data = request.get_json()
+
+        grade = Grade(
+            student_id=data['student_id'],
+            course_id=data['course_id'],
+            semester=data['semester'],
+            academic_year=data['academic_year'],
+            score=data['score'],
+            grade=data['grade'],
+            grade_points=data['grade_points']
+        )
+
+        db.session.add(grade)
+        db.session.commit()
+
+        return jsonify({'message': 'Grade created successfully', 'grade': grade.to_dict()}), 201
+    except IntegrityError as e:
+        return integrity_error_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+# Lookup endpoints for dropdowns
+@api.route('/programs', methods=['GET'])
+def get_programs():
+    try:
+        programs = db.session.scalars(statements.PROGRAMS)
+        return jsonify([p.to_dict() for p in programs])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/departments', methods=['GET'])
+def get_departments():
+    try:
+        departments = db.session.scalars(statements.DEPARTMENTS)
+        return jsonify([d.to_dict() for d in departments])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/instructors', methods=['GET'])
+def get_instructors():
+    try:
+        instructors = db.session.scalars(statements.INSTRUCTORS)
+        return jsonify([i.to_dict() for i in instructors])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Lightweight option endpoints for form dropdowns
+OPTIONS_CACHE_TTL = 60  # seconds
+OPTIONS_DEFAULT_LIMIT = 100
+OPTIONS_MAX_LIMIT = 5000
+
+_options_cache = TTLCache(OPTIONS_CACHE_TTL)
+
+
+def _cached_options(key, loader):
+    """Return cached (id, label) options for key, calling loader on a miss"""
+    return _options_cache.get(key, loader)
+
+
+def invalidate_options_cache():
+    """Drop cached dropdown options after students or courses change"""
+    _options_cache.clear()
+
+
+def _options_args():
+    prefix = request.args.get('q', '').strip()
+    limit = request.args.get('limit', OPTIONS_DEFAULT_LIMIT, type=int)
+    return prefix, max(1, min(limit, OPTIONS_MAX_LIMIT))
+
+
+def _options_response(rows, limit):
+    # One extra row is fetched so truncation is reported instead of silent
+    return {
+        'options': [{'id': row[0], 'label': row[1]} for row in rows[:limit]],
+        'truncated': len(rows) > limit
+    }
+
+
+@api.route('/options/students', methods=['GET'])
+def get_student_options():
+    try:
+        prefix, limit = _options_args()
+
+        def load():
+            stmt = statements.STUDENT_OPTIONS_BY_PREFIX if prefix else statements.STUDENT_OPTIONS
+            rows = db.session.execute(
+                stmt, {'pattern': statements.like_prefix(prefix.upper()), 'limit': limit + 1}
+            ).all()
+            return _options_response(
+                [(r.id, f"{r.first_name} {r.last_name} ({r.student_id})") for r in rows], limit
+            )
+
+        return jsonify(_cached_options(('students', prefix, limit), load))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/options/courses', methods=['GET'])
+def get_course_options():
+    try:
+        prefix, limit = _options_args()
+
+        def load():
+            stmt = statements.COURSE_OPTIONS_BY_PREFIX if prefix else statements.COURSE_OPTIONS
+            rows = db.session.execute(
+                stmt, {'pattern': statements.like_prefix(prefix.upper()), 'limit': limit + 1}
+            ).all()
+            return _options_response([(r.id, f"{r.course_code} - {r.title}") for r in rows], limit)
+
+        return jsonify(_cached_options(('courses', prefix, limit), load))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Audit log endpoint (see audit.py)
+@api.route('/audit', methods=['GET'])
+def get_audit_log():
+    try:
+        from audit import query_audit_log
+        since = request.args.get('since')
+        until = request.args.get('until')
+        return jsonify(query_audit_log(
+            table_name=request.args.get('table'),
+            row_id=request.args.get('row_id', type=int),
+            action=request.args.get('action'),
+            since=datetime.fromisoformat(since) if since else None,
+            until=datetime.fromisoformat(until) if until else None,
+            before_id=request.args.get('before_id', type=int),
+            limit=max(1, min(request.args.get('limit', 50, type=int), 500))
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Promotion job endpoints (see promotion.py)
+@api.route('/jobs/promotion', methods=['POST'])
+def create_promotion_job():
+    try:
+        from promotion import ACADEMIC_YEAR, get_run, preview_promotion, start_promotion_job
+        data = request.get_json(silent=True) or {}
+        if data.get('dry_run', True):
+            return jsonify(preview_promotion())
+
+        academic_year = data.get('academic_year') or ''
+        if not ACADEMIC_YEAR.match(academic_year):
+            return jsonify({'error': 'academic_year is required, e.g. 2024/2025'}), 400
+        job_id = start_promotion_job(academic_year)
+        if job_id is None:
+            run = get_run(academic_year)
+            if run and run['status'] == 'completed':
+                return jsonify({'error': f'Students have already been promoted for {academic_year}',
+                                'code': 'already_promoted', 'job': run}), 409
+            return jsonify({'error': 'A promotion job is already running', 'code': 'job_running',
+                            'job': run}), 409
+        return jsonify({'job_id': job_id}), 202
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    try:
+        from promotion import get_job
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# Admission control metrics (see admission.py)
+@api.route('/admission/metrics', methods=['GET'])
+def get_admission_metrics():
+    admission = current_app.extensions.get('admission')
+    return jsonify(admission.snapshot() if admission else {})
+
+
+# Analytics endpoints (see analytics.py)
+def _term_args():
+    return request.args.get('academic_year'), request.args.get('semester')
+
+
+@api.route('/analytics/enrollments', methods=['GET'])
+def get_enrollment_analytics():
+    try:
+        import analytics
+        academic_year, semester = _term_args()
+        return jsonify(analytics.cached(
+            ('enrollments', academic_year, semester),
+            lambda: analytics.enrollment_counts(academic_year, semester)
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/analytics/grades', methods=['GET'])
+def get_grade_analytics():
+    try:
+        import analytics
+        academic_year, semester = _term_args()
+        course_id = request.args.get('course_id', type=int)
+        return jsonify(analytics.cached(
+            ('grades', course_id, academic_year, semester),
+            lambda: analytics.grade_distribution(course_id, academic_year, semester)
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/analytics/pass-rates', methods=['GET'])
+def get_pass_rate_analytics():
+    try:
+        import analytics
+        academic_year, semester = _term_args()
+        return jsonify(analytics.cached(
+            ('pass_rates', academic_year, semester),
+            lambda: analytics.pass_rates(academic_year, semester)
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api.route('/analytics/retention', methods=['GET'])
+def get_retention_analytics():
+    try:
+        import analytics
+        return jsonify(analytics.cached(('retention',), analytics.cohort_retention))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
@@ -0,0 +1,164 @@
+"""
+Archival of inactive courses and old enrollments for UENR Student Management System
+Rows are moved out of the hot tables in batches and can be unioned back for audits
+"""
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, exists, func, literal, or_, select, union_all
+
+from extensions import db
+from models import Course, Enrollment, Grade, CourseArchive, EnrollmentArchive, course_prerequisites
+from statements import like_contains
+from tenancy import use_campus
+
+# Table-level constructs with include_inactive bypass the ORM soft-delete
+# filter, which is what archival and audit queries need
+courses = Course.__table__
+enrollments = Enrollment.__table__
+grades = Grade.__table__
+courses_archive = CourseArchive.__table__
+enrollments_archive = EnrollmentArchive.__table__
+
+
+def _move_batch(source, target, condition, batch_size):
+    """Move up to batch_size rows matching condition from source to target in one statement"""
+    columns = [c.name for c in source.columns]
+    ids = (
+        select(source.c.id)
+        .where(condition)
+        .order_by(source.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = delete(source).where(source.c.id.in_(ids)).returning(*source.columns).cte('moved')
+    stmt = target.insert().from_select(
+        columns + ['archived_at'],
+        select(*[moved.c[name] for name in columns], func.now())
+    )
+    result = db.session.execute(stmt)
+    db.session.commit()
+    return result.rowcount
+
+
+def _move_all(source, target, condition, batch_size, label, progress=None):
+    total = 0
+    while True:
+        moved = _move_batch(source, target, condition, batch_size)
+        if not moved:
+            return total
+        total += moved
+        if progress:
+            progress(f"  {label}: {total} archived")
+
+
+def run_archive(before_year=None, batch_size=1000, progress=None):
+    """
+    Archive enrollments of inactive courses, finished enrollments older than
+    before_year, and inactive courses that nothing references any more
+    """
+    inactive_course_ids = select(courses.c.id).where(courses.c.is_active == False)
+
+    enrollment_condition = enrollments.c.course_id.in_(inactive_course_ids)
+    if before_year:
+        enrollment_condition = or_(
+            enrollment_condition,
+            (enrollments.c.academic_year < str(before_year)) & (enrollments.c.status != 'Enrolled')
+        )
+
+    counts = {
+        'enrollments': _move_all(enrollments, enrollments_archive, enrollment_condition,
+                                 batch_size, 'enrollments', progress)
+    }
+
+    # Courses with grades or prerequisite links stay in place to keep those rows valid
+    course_condition = (courses.c.is_active == False) \
+        & ~exists().where(enrollments.c.course_id == courses.c.id) \
+        & ~exists().where(grades.c.course_id == courses.c.id) \
+        & ~exists().where(or_(course_prerequisites.c.course_id == courses.c.id,
+                              course_prerequisites.c.prerequisite_id == courses.c.id))
+    counts['courses'] = _move_all(courses, courses_archive, course_condition, batch_size, 'courses', progress)
+    return counts
+
+
+@click.command('archive')
+@click.option('--before-year', help='Archive finished enrollments from academic years before this one, e.g. 2020')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows moved per transaction')
+@click.option('--campus', help='Campus to archive (defaults to DEFAULT_CAMPUS)')
+@with_appcontext
+def archive_command(before_year, batch_size, campus):
+    """Move inactive courses and old enrollments into archive tables"""
+    with use_campus(campus):
+        counts = run_archive(before_year=before_year, batch_size=batch_size, progress=click.echo)
+    click.echo(f"Archived {counts['enrollments']} enrollments and {counts['courses']} courses")
+
+
+def _course_rows():
+    live = select(
+        courses.c.id, courses.c.course_code, courses.c.title, courses.c.credits,
+        courses.c.department_id, courses.c.instructor_id, courses.c.level, courses.c.semester,
+        courses.c.is_active, courses.c.created_at, literal(False).label('archived')
+    )
+    archived = select(
+        courses_archive.c.id, courses_archive.c.course_code, courses_archive.c.title, courses_archive.c.credits,
+        courses_archive.c.department_id, courses_archive.c.instructor_id, courses_archive.c.level,
+        courses_archive.c.semester, courses_archive.c.is_active, courses_archive.c.created_at,
+        literal(True).label('archived')
+    )
+    return union_all(live, archived).subquery('all_courses')
+
+
+def _enrollment_rows():
+    columns = ['id', 'student_id', 'course_id', 'semester', 'academic_year', 'enrollment_date', 'status', 'created_at']
+    live = select(*[enrollments.c[name] for name in columns], literal(False).label('archived'))
+    archived = select(*[enrollments_archive.c[name] for name in columns], literal(True).label('archived'))
+    return union_all(live, archived).subquery('all_enrollments')
+
+
+def _serialize(row):
+    item = dict(row._mapping)
+    for key in ('created_at', 'enrollment_date'):
+        if item.get(key) is not None:
+            item[key] = item[key].isoformat()
+    return item
+
+
+def list_courses_with_archived(search='', department_id=None, page=1, per_page=10):
+    """Page through live, inactive and archived courses for audits"""
+    rows = _course_rows()
+    query = select(rows).execution_options(include_inactive=True)
+    if search:
+        pattern = like_contains(search)
+        query = query.where(or_(rows.c.course_code.ilike(pattern, escape='\\'),
+                                rows.c.title.ilike(pattern, escape='\\')))
+    if department_id:
+        query = query.where(rows.c.department_id == department_id)
+
+    total = db.session.execute(
+        select(func.count()).select_from(query.subquery()).execution_options(include_inactive=True)
+    ).scalar()
+    page = max(page, 1)
+    items = db.session.execute(
+        query.order_by(rows.c.course_code, rows.c.archived).limit(per_page).offset((page - 1) * per_page)
+    ).all()
+    pages = (total + per_page - 1) // per_page if per_page else 0
+
+    return {
+        'courses': [_serialize(r) for r in items],
+        'total': total,
+        'pages': pages,
+        'current_page': page,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+
+def list_enrollments_with_archived(student_id=None, course_id=None):
+    """List live and archived enrollments for audits"""
+    rows = _enrollment_rows()
+    query = select(rows).execution_options(include_inactive=True)
+    if student_id:
+        query = query.where(rows.c.student_id == student_id)
+    if course_id:
+        query = query.where(rows.c.course_id == course_id)
+    return [_serialize(r) for r in db.session.execute(query.order_by(rows.c.created_at.desc()))]
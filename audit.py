@@ -0,0 +1,385 @@
+"""
+Audit trail for UENR Student Management System
+Changes to students, grades, enrollments and courses are captured during
+flush, queued once the transaction commits and written to audit_log in
+batches by a background thread, off the request's hot path. The log lives
+in the main database for all campuses.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+
+from flask import has_request_context, request
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import DBAPIError, OperationalError, StatementError
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import AuditLog, Course, Enrollment, Grade, Student
+from tenancy import current_campus
+
+try:
+    import fcntl
+except ImportError:  # Windows, where the app runs as a single process
+    fcntl = None
+
+AUDITED_MODELS = (Student, Grade, Enrollment, Course)
+IGNORED_FIELDS = {'created_at', 'updated_at', 'enrolled_count'}
+
+logger = logging.getLogger(__name__)
+
+_writer = None
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _snapshot(obj):
+    """Loaded column values of obj, without triggering any lazy loads"""
+    state = inspect(obj)
+    return {
+        prop.key: _json_value(state.dict[prop.key])
+        for prop in state.mapper.column_attrs
+        if prop.key in state.dict and prop.key not in IGNORED_FIELDS
+    }
+
+
+def _diff(obj):
+    """{field: {'before': ..., 'after': ...}} for the columns changed on obj"""
+    state = inspect(obj)
+    changes = {}
+    for prop in state.mapper.column_attrs:
+        if prop.key in IGNORED_FIELDS:
+            continue
+        history = state.attrs[prop.key].history
+        if not history.has_changes():
+            continue
+        before = history.deleted[0] if history.deleted else None
+        after = history.added[0] if history.added else None
+        if before != after:
+            changes[prop.key] = {'before': _json_value(before), 'after': _json_value(after)}
+    return changes
+
+
+def _is_current(f, path):
+    """True while f is still the file at path, i.e. no worker has renamed it away"""
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+def _pid_alive(pid):
+    if fcntl is None:
+        return pid == os.getpid()  # single process: any other pid is an earlier run
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _is_connection_error(error):
+    """True when error says nothing about the record itself, only that the database is unreachable"""
+    return isinstance(error, OperationalError) or (isinstance(error, DBAPIError) and error.connection_invalidated)
+
+
+def _request_context():
+    if has_request_context():
+        return f"{request.method} {request.path}"[:200]
+    return None
+
+
+class AuditWriter:
+    """Bounded in-process queue drained in batches by a background thread.
+    Batches that cannot be written go to a JSON lines fallback file, which is
+    replayed before the next successful write. All workers share the file:
+    appends and the rename that claims it for replay hold an exclusive flock,
+    so no record is appended to a file after it has been claimed. Records that
+    cannot be decoded or that the database refuses are moved to a .rejected
+    file, so one bad line never blocks the records queued behind it."""
+
+    def __init__(self, engine, queue_size, batch_size, flush_interval, fallback_path):
+        self.engine = engine
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fallback_path = fallback_path
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _ensure_started(self):
+        # Started lazily so a preloaded master never forks a half-used queue or thread
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._write_lock = threading.Lock()
+            self._file_lock = threading.Lock()
+            threading.Thread(target=self._run, name='audit-writer', daemon=True).start()
+            self._pid = os.getpid()
+
+    def submit(self, records):
+        self._ensure_started()
+        overflow = []
+        for record in records:
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                overflow.append(record)
+        if overflow:
+            logger.warning("Audit queue full, writing %d records to %s", len(overflow), self.fallback_path)
+            self._write_fallback(overflow)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        """Write everything still queued; called at interpreter exit"""
+        if self._pid != os.getpid():
+            return
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        with self._write_lock:
+            replay_path, rejected = None, []
+            try:
+                with self.engine.begin() as conn:
+                    replay_path, rejected = self._replay_fallback(conn)
+                    # A list of parameter sets is sent as multi-row INSERTs
+                    conn.execute(AuditLog.__table__.insert(), batch)
+            except Exception:
+                logger.exception("Audit write failed, writing %d records to %s", len(batch), self.fallback_path)
+                self._write_fallback(batch)
+                return
+            if rejected:
+                self._write_rejected(rejected)
+            if replay_path:
+                os.remove(replay_path)
+
+    def _write_fallback(self, records):
+        lines = ''.join(json.dumps(record, default=_json_value) + '\n' for record in records)
+        with self._file_lock:
+            while True:
+                with open(self.fallback_path, 'a', encoding='utf-8') as f:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # released on close
+                    # If another worker claimed the file while we waited, append to a new one
+                    if _is_current(f, self.fallback_path):
+                        f.write(lines)
+                        return
+
+    def _claim_fallback(self, replay_path):
+        """Rename the fallback file to replay_path; False if there is nothing to claim"""
+        with self._file_lock:
+            try:
+                if fcntl is None:
+                    os.replace(self.fallback_path, replay_path)
+                    return True
+                with open(self.fallback_path, encoding='utf-8') as f:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    if not _is_current(f, self.fallback_path):
+                        return False  # claimed by another worker; the new file is left for next time
+                    os.replace(self.fallback_path, replay_path)
+                    return True
+            except FileNotFoundError:
+                return False
+
+    def _write_rejected(self, lines):
+        rejected_path = f"{self.fallback_path}.rejected"
+        logger.error("Moving %d audit records that cannot be replayed to %s", len(lines), rejected_path)
+        with self._file_lock, open(rejected_path, 'a', encoding='utf-8') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            f.write(''.join(line + '\n' for line in lines))
+
+    def _adopt_orphan(self, replay_path):
+        """Take over a replay file left by a worker that died before removing it"""
+        for path in glob.glob(glob.escape(self.fallback_path) + '.replay.*'):
+            pid = path.rsplit('.', 1)[1]
+            if not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            try:
+                os.replace(path, replay_path)
+            except FileNotFoundError:
+                continue  # adopted by another worker first
+            logger.warning("Replaying audit records left in %s by exited worker %s", path, pid)
+            return True
+        return False
+
+    def _replay_fallback(self, conn):
+        """Insert records from the fallback file. Returns its path, for removal
+        after commit, and the lines to move to the rejected file"""
+        replay_path = f"{self.fallback_path}.replay.{os.getpid()}"
+        if not os.path.exists(replay_path) and not self._adopt_orphan(replay_path) \
+                and not self._claim_fallback(replay_path):
+            return None, []
+        records, rejected = [], []
+        with open(replay_path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    record['changed_at'] = datetime.fromisoformat(record['changed_at'])
+                except (ValueError, TypeError, KeyError):
+                    rejected.append(line)  # e.g. a partial line from a worker killed mid-write
+                    continue
+                records.append(record)
+        if records:
+            rejected.extend(json.dumps(record, default=_json_value) for record in self._insert_replayed(conn, records))
+        return replay_path, rejected
+
+    def _insert_replayed(self, conn, records):
+        """Insert records, one savepoint each if the batch fails; returns those the database refuses"""
+        insert = AuditLog.__table__.insert()
+        try:
+            with conn.begin_nested():
+                conn.execute(insert, records)
+            return []
+        except StatementError as e:
+            if _is_connection_error(e):
+                raise
+        refused = []
+        for record in records:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert, record)
+            except StatementError as e:
+                if _is_connection_error(e):
+                    raise
+                refused.append(record)
+        return refused
+
+
+# Session hooks: diffs are taken in before_flush while attribute history is
+# still available, given ids in after_flush, and only queued after commit
+@event.listens_for(Session, 'before_flush')
+def _capture_changes(session, flush_context, instances):
+    if _writer is None:
+        return
+    context = (current_campus(), _request_context())
+    pending = session.info.setdefault('audit_pending', [])
+    for obj in session.new:
+        if isinstance(obj, AUDITED_MODELS):
+            pending.append((obj, 'insert', None, context))
+    for obj in session.dirty:
+        if isinstance(obj, AUDITED_MODELS) and session.is_modified(obj, include_collections=False):
+            changes = _diff(obj)
+            if changes:
+                pending.append((obj, 'update', changes, context))
+    for obj in session.deleted:
+        if isinstance(obj, AUDITED_MODELS):
+            snapshot = _snapshot(obj)
+            changes = {key: {'before': value, 'after': None} for key, value in snapshot.items()}
+            pending.append((obj, 'delete', changes, context))
+
+
+@event.listens_for(Session, 'after_flush')
+def _assign_ids(session, flush_context):
+    pending = session.info.pop('audit_pending', None)
+    if not pending:
+        return
+    now = datetime.utcnow()
+    records = session.info.setdefault('audit_records', [])
+    for obj, action, changes, (campus, context) in pending:
+        if action == 'insert':
+            changes = {key: {'before': None, 'after': value} for key, value in _snapshot(obj).items()}
+        records.append({
+            'campus': campus,
+            'table_name': obj.__tablename__,
+            'row_id': obj.id,
+            'action': action,
+            'changes': changes,
+            'context': context,
+            'changed_at': now
+        })
+
+
+@event.listens_for(Session, 'after_commit')
+def _enqueue_records(session):
+    records = session.info.pop('audit_records', None)
+    if records and _writer is not None:
+        _writer.submit(records)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_records(session):
+    session.info.pop('audit_pending', None)
+    session.info.pop('audit_records', None)
+
+
+def init_audit(app):
+    """Start auditing changes made through this app's sessions"""
+    global _writer
+    if not app.config.get('AUDIT_ENABLED', True):
+        return
+    fallback_path = app.config.get('AUDIT_FALLBACK_PATH') or os.path.join(app.instance_path, 'audit_fallback.jsonl')
+    os.makedirs(os.path.dirname(fallback_path), exist_ok=True)
+    with app.app_context():
+        engine = db.engine
+    _writer = AuditWriter(
+        engine,
+        queue_size=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+        batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+        flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 1.0),
+        fallback_path=fallback_path
+    )
+
+
+def query_audit_log(table_name=None, row_id=None, action=None, since=None, until=None, before_id=None, limit=50):
+    """Newest-first audit entries for the current campus, paged by id (pass the last id seen as before_id)"""
+    query = AuditLog.query.filter(AuditLog.campus == current_campus())
+    if table_name:
+        query = query.filter(AuditLog.table_name == table_name)
+    if row_id:
+        query = query.filter(AuditLog.row_id == row_id)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if since:
+        query = query.filter(AuditLog.changed_at >= since)
+    if until:
+        query = query.filter(AuditLog.changed_at < until)
+    if before_id:
+        query = query.filter(AuditLog.id < before_id)
+    entries = query.order_by(AuditLog.id.desc()).limit(limit).all()
+    return {
+        'entries': [e.to_dict() for e in entries],
+        'next_before_id': entries[-1].id if len(entries) == limit else None
+    }
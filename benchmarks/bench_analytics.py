@@ -0,0 +1,165 @@
+"""
+Time the analytics endpoints, cold (cache cleared before each request) and
+cached. With --rows N, N synthetic grades (and matching enrollments) are
+bulk-loaded with generate_series into a throwaway campus schema, which is
+dropped afterwards unless --keep is given; without it the database in .env
+is used as is. --compare also times the client-side alternative: fetching
+every grade and summarising it in Python.
+Run: python benchmarks/bench_analytics.py --rows 2000000 [--courses 500] [--rounds 5] [--compare]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app import create_app
+
+URLS = ('/api/analytics/enrollments', '/api/analytics/grades',
+        '/api/analytics/pass-rates', '/api/analytics/retention')
+
+BENCH_CAMPUS = 'bench_analytics'
+BENCH_SCHEMA = 'bench_analytics'
+
+# Run with search_path set to the benchmark schema. Student s takes courses
+# 1..:courses in turn, so (student, course) pairs never repeat.
+LOAD_SQL = (
+    "INSERT INTO departments (id, name, code, created_at) VALUES (1, 'Benchmark', 'BEN', now())",
+    "INSERT INTO programs (id, name, code, degree_type, duration_years, department_id, created_at) "
+    "VALUES (1, 'Benchmark BSc', 'BENBSC', 'BSc', 4, 1, now())",
+    "INSERT INTO students (id, student_id, first_name, last_name, email, program_id, level, status, "
+    "admission_date, created_at, updated_at) "
+    "SELECT s, 'BEN' || s, 'Student', s::text, 'bench' || s || '@example.com', 1, 100 * (1 + s % 4), "
+    "'Active', make_date(2019 + s % 6, 9, 1), now(), now() FROM generate_series(1, :students) s",
+    "INSERT INTO courses (id, course_code, title, credits, department_id, level, semester, is_active, "
+    "created_at, updated_at) "
+    "SELECT c, 'BEN' || c, 'Benchmark course ' || c, 3, 1, 100 * (1 + c % 4), 'First', true, now(), now() "
+    "FROM generate_series(1, :courses) c",
+    "INSERT INTO enrollments (student_id, course_id, semester, academic_year, enrollment_date, status, created_at) "
+    "SELECT (g - 1) / :courses + 1, (g - 1) % :courses + 1, 'First', '2024/2025', current_date, 'Enrolled', now() "
+    "FROM generate_series(1, :rows) g",
+    # Roughly normal scores around 62 (Box-Muller), clamped to 0-100
+    "INSERT INTO grades (student_id, course_id, semester, academic_year, score, grade, grade_points, "
+    "created_at, updated_at) "
+    "SELECT student_id, course_id, 'First', '2024/2025', score, "
+    "CASE WHEN score >= 80 THEN 'A' WHEN score >= 70 THEN 'B' WHEN score >= 60 THEN 'C' "
+    "WHEN score >= 50 THEN 'D' ELSE 'F' END, "
+    "CASE WHEN score >= 80 THEN 4.0 WHEN score >= 70 THEN 3.0 WHEN score >= 60 THEN 2.0 "
+    "WHEN score >= 50 THEN 1.0 ELSE 0.0 END, now(), now() "
+    "FROM (SELECT (g - 1) / :courses + 1 AS student_id, (g - 1) % :courses + 1 AS course_id, "
+    "round(least(100, greatest(0, 62 + 15 * sqrt(-2 * ln(1 - random())) * cos(2 * pi() * random())))"
+    "::numeric, 1)::float AS score FROM generate_series(1, :rows) g) generated",
+    "ANALYZE",
+)
+
+
+def median_ms(fn, rounds, before=None):
+    samples = []
+    for _ in range(rounds):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def python_summary():
+    """What a client has to do without the grades endpoint: fetch every grade and aggregate"""
+    from sqlalchemy import select
+    from extensions import db
+    from models import Grade
+
+    by_course = {}
+    for course_id, score in db.session.execute(select(Grade.course_id, Grade.score)):
+        by_course.setdefault(course_id, []).append(score)
+    result = {}
+    for course_id, scores in by_course.items():
+        scores.sort()
+        n = len(scores)
+        histogram = [0] * 10
+        for s in scores:
+            histogram[min(int(s // 10), 9)] += 1
+        result[course_id] = {
+            'mean': sum(scores) / n,
+            'median': scores[n // 2],
+            'pass_rate': sum(1 for s in scores if s >= 50) / n,
+            'histogram': histogram
+        }
+    return result
+
+
+def load_synthetic(app, rows, courses):
+    """Create the benchmark campus schema and fill it with rows grades"""
+    from extensions import db
+    from tenancy import CENTRAL_TABLES, campus_engine, registry, use_campus
+
+    with app.app_context():
+        registry().campuses[BENCH_CAMPUS] = {'schema': BENCH_SCHEMA}
+        with use_campus(BENCH_CAMPUS):
+            engine = campus_engine()
+        with db.engine.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA IF EXISTS "{BENCH_SCHEMA}" CASCADE'))
+            conn.execute(text(f'CREATE SCHEMA "{BENCH_SCHEMA}"'))
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            tables = [t for t in db.metadata.sorted_tables if t.name not in CENTRAL_TABLES]
+            db.metadata.create_all(conn, tables=tables)
+            conn.execute(text(f'SET LOCAL search_path TO "{BENCH_SCHEMA}"'))
+            params = {'rows': rows, 'courses': courses, 'students': -(-rows // courses)}
+            for sql in LOAD_SQL:
+                conn.execute(text(sql), params)
+        print(f"Loaded {rows} grades across {courses} courses in {time.perf_counter() - start:.1f} s")
+
+
+def drop_synthetic(app):
+    from extensions import db
+
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{BENCH_SCHEMA}" CASCADE'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, help='bulk-load this many synthetic grades into a throwaway schema')
+    parser.add_argument('--courses', type=int, default=500)
+    parser.add_argument('--keep', action='store_true', help='keep the synthetic schema afterwards')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--compare', action='store_true',
+                        help='also time fetching every grade and aggregating in Python')
+    args = parser.parse_args()
+
+    import analytics
+    from tenancy import use_campus
+    app = create_app()
+    app.extensions['admission'].enabled = False  # the grade analytics rate limit would cut the run short
+    client = app.test_client()
+    campus = None
+    headers = {}
+    if args.rows:
+        load_synthetic(app, args.rows, args.courses)
+        campus = BENCH_CAMPUS
+        headers = {'X-Campus': campus}
+
+    try:
+        print(f"{'endpoint':<34}{'cold ms':>12}{'cached ms':>12}")
+        for url in URLS:
+            cold = median_ms(lambda: client.get(url, headers=headers), args.rounds, before=analytics._cache.clear)
+            warm = median_ms(lambda: client.get(url, headers=headers), args.rounds)
+            print(f"{url:<34}{cold:>12.1f}{warm:>12.1f}")
+
+        if args.compare:
+            with app.app_context(), use_campus(campus):
+                print(f"{'fetch all grades + Python':<34}{median_ms(python_summary, args.rounds):>12.1f}")
+    finally:
+        if args.rows and not args.keep:
+            drop_synthetic(app)
+
+
+if __name__ == '__main__':
+    main()
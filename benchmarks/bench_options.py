@@ -0,0 +1,50 @@
+"""
+Compare the dropdown option endpoints against the full list endpoints
+Run with the database configured in .env: python benchmarks/bench_options.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from api import invalidate_options_cache
+
+ROUNDS = 20
+
+
+def timed(client, url, before=None):
+    """Return the median request time in milliseconds and the payload size"""
+    samples = []
+    size = 0
+    for _ in range(ROUNDS):
+        if before:
+            before()
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        size = len(response.data)
+    samples.sort()
+    return samples[len(samples) // 2], size
+
+
+def main():
+    client = create_app().test_client()
+    cases = [
+        ('students (full)', '/api/students?per_page=1000', None),
+        ('students (options, cold)', '/api/options/students?limit=5000', invalidate_options_cache),
+        ('students (options, cached)', '/api/options/students?limit=5000', None),
+        ('courses (full)', '/api/courses?per_page=1000', None),
+        ('courses (options, cold)', '/api/options/courses?limit=5000', invalidate_options_cache),
+        ('courses (options, cached)', '/api/options/courses?limit=5000', None),
+    ]
+    print(f"{'case':<30}{'median ms':>12}{'bytes':>12}")
+    for name, url, before in cases:
+        median, size = timed(client, url, before)
+        print(f"{name:<30}{median:>12.2f}{size:>12}")
+
+
+if __name__ == '__main__':
+    main()
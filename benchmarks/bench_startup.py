@@ -0,0 +1,82 @@
+"""
+Measure application startup: module import time, create_app() time, the
+first page request and the first database-backed API request (engine
+connect and statement compile), each in a fresh interpreter
+Run with the database configured in .env:
+    python benchmarks/bench_startup.py --save    # record this machine's baseline
+    python benchmarks/bench_startup.py --check   # compare against it
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'startup_baseline.json')
+
+API_URL = '/api/students?per_page=1'
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+client = app.test_client()
+t2 = time.perf_counter()
+client.get('/')
+t3 = time.perf_counter()
+status = client.get(%r).status_code
+t4 = time.perf_counter()
+print(json.dumps({'import_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+                  'first_page_ms': (t3 - t2) * 1000, 'first_api_request_ms': (t4 - t3) * 1000,
+                  'total_ms': (t4 - t0) * 1000, 'api_status': status}))
+""" % API_URL
+
+
+def measure(runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        if sample.pop('api_status') != 200:
+            sys.exit(f"GET {API_URL} failed; check the database settings in .env")
+        samples.append(sample)
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--save', action='store_true', help='store the result as the new baseline')
+    parser.add_argument('--check', action='store_true', help='fail if slower than baseline * tolerance')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    args = parser.parse_args()
+
+    if args.check and not os.path.exists(BASELINE):
+        sys.exit(f"No baseline at {BASELINE}; run with --save first on this machine")
+
+    result = measure(args.runs)
+    for key, value in result.items():
+        print(f"{key:<22}{value:10.1f} ms")
+
+    if args.save:
+        with open(BASELINE, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Baseline saved to {BASELINE}")
+
+    if args.check:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+        regressions = [key for key in ('import_ms', 'total_ms') if result[key] > baseline[key] * args.tolerance]
+        for key in regressions:
+            print(f"REGRESSION: {key} {result[key]:.1f} ms > {baseline[key]:.1f} ms x {args.tolerance}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
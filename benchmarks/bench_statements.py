@@ -0,0 +1,83 @@
+"""
+Per-request cost of the student list query run through db.session.execute,
+so the soft-delete do_orm_execute hook runs exactly as it does in the app:
+an ORM Query filter chain rebuilt on every request (before) against the
+prebuilt statements in statements.py (after). Also reports the cache key
+generation time of the statements that reach the compiled cache, after the
+hook has seen them.
+Run with the database configured in .env: python benchmarks/bench_statements.py [--iterations 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+
+import statements
+from app import create_app
+from extensions import db
+from models import Student
+
+SEARCH = 'kwame'
+PROGRAM_ID = 2
+PER_PAGE = 10
+
+_cache_key_seconds = [0.0]
+
+
+# Registered after the soft-delete hook in models.py, so it sees the final statement
+@event.listens_for(Session, 'do_orm_execute')
+def _time_cache_key(execute_state):
+    start = time.perf_counter()
+    execute_state.statement._generate_cache_key()  # memoized, so execution reuses it
+    _cache_key_seconds[0] += time.perf_counter() - start
+
+
+def before():
+    query = Student.query
+    query = query.filter(or_(
+        Student.first_name.ilike(f'%{SEARCH}%'),
+        Student.last_name.ilike(f'%{SEARCH}%'),
+        Student.student_id.ilike(f'%{SEARCH}%'),
+        Student.email.ilike(f'%{SEARCH}%')
+    ))
+    query = query.filter_by(program_id=PROGRAM_ID).order_by(Student.created_at.desc())
+    return query.paginate(page=1, per_page=PER_PAGE, error_out=False).items
+
+
+def after():
+    params = {'pattern': statements.like_contains(SEARCH), 'program_id': PROGRAM_ID}
+    return statements.paginate(statements.student_list(True, True), params, 1, PER_PAGE)['items']
+
+
+def measure(fn, iterations):
+    fn()  # warm the compiled cache
+    _cache_key_seconds[0] = 0.0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+        db.session.rollback()
+    total = time.perf_counter() - start
+    return total / iterations * 1e6, _cache_key_seconds[0] / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print(f"{'per request (count + page)':<32}{'total us':>12}{'cache key us':>14}")
+        for name, fn in (('ORM Query rebuilt per request', before), ('prebuilt select() + bindparam', after)):
+            total, cache_key = measure(fn, args.iterations)
+            print(f"{name:<32}{total:>12.1f}{cache_key:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
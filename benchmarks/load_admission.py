@@ -0,0 +1,76 @@
+"""
+Overload a guarded route and report latency percentiles by outcome
+By default a synthetic route that holds a slot for --work-ms stands in for
+a database query, so no database is needed; --endpoint hits a real route
+Run: python benchmarks/load_admission.py [--clients 64] [--requests 20]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=20, help='requests per client')
+    parser.add_argument('--work-ms', type=float, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--endpoint', help='real URL to load, e.g. /api/grades (needs the database)')
+    args = parser.parse_args()
+
+    app = create_app()
+    admission = app.extensions['admission']
+    url = args.endpoint
+    if not url:
+        @app.route('/_load/slow')
+        def slow():
+            time.sleep(args.work_ms / 1000)
+            return {'ok': True}
+        admission.configure('slow', concurrency=args.concurrency)
+        url = '/_load/slow'
+
+    results = defaultdict(list)
+    lock = threading.Lock()
+
+    def client(n):
+        test_client = app.test_client()
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            # Distinct addresses so per-client rate limits do not mask the concurrency cap
+            status = test_client.get(url, environ_base={'REMOTE_ADDR': f'10.0.{n // 256}.{n % 256}'}).status_code
+            with lock:
+                results[status].append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in results.values())
+    print(f"{total} requests from {args.clients} clients in {elapsed:.1f}s against {url}")
+    print(f"{'status':<8}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for status in sorted(results):
+        values = results[status]
+        print(f"{status:<8}{len(values):>8}{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{max(values):>10.1f}")
+    print(admission.snapshot())
+
+
+if __name__ == '__main__':
+    main()
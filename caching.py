@@ -0,0 +1,42 @@
+"""
+In-process TTL cache for read-mostly endpoint results
+Keys are prefixed with the current campus, so campuses never share entries
+"""
+
+import threading
+import time
+
+from tenancy import current_campus
+
+
+class TTLCache:
+    """Thread-safe cache of loader results that expire after ttl seconds.
+    The whole cache is dropped when it reaches max_entries, which keeps it
+    bounded without tracking recency."""
+
+    def __init__(self, ttl, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Return the cached result for key, calling loader on a miss"""
+        key = (current_campus(),) + tuple(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        result = loader()
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (now + self.ttl, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
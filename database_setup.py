@@ -4,9 +4,13 @@ Database setup script for UENR Student Management System
 Run this script to create the database schema and populate with initial data
 """
 
-from app import app, db, Department, Program, Instructor, Student, Course
+from app import create_app
+from extensions import db
+from models import Department, Program, Instructor, Student, Course
 from datetime import datetime, date
 
+app = create_app(minimal=True)
+
 
 def create_database():
     """Create all database tables"""
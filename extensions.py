@@ -0,0 +1,6 @@
+# extensions.py - extension objects, bound to the application in create_app()
+from flask_sqlalchemy import SQLAlchemy
+
+from tenancy import TenantSession
+
+db = SQLAlchemy(session_options={'class_': TenantSession})
@@ -0,0 +1,17 @@
+# gunicorn.conf.py - gunicorn -c gunicorn.conf.py "app:create_app()"
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Import the app once in the master; workers inherit it on fork. Each worker
+# gets a fresh connection pool via the fork hook registered in create_app().
+preload_app = True
+
+
+def when_ready(server):
+    # Move everything loaded by the preloaded app out of the garbage collector's
+    # tracked generations so workers keep sharing those pages copy-on-write
+    gc.freeze()
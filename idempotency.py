@@ -0,0 +1,197 @@
+"""
+Idempotency-Key support for retry-safe write endpoints
+The first request with a key claims it, runs the handler and stores the
+response; replays of the same key get the stored response back without
+running the handler again
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import Response, current_app, jsonify, make_response, request
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from extensions import db
+from models import IdempotencyKey
+from tenancy import current_campus
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 100
+HOT_CACHE_SIZE = 10000
+PURGE_INTERVAL = 600  # seconds between opportunistic purges per process
+PURGE_BATCH_SIZE = 1000
+
+keys = IdempotencyKey.__table__
+
+_hot_cache = OrderedDict()
+_hot_cache_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def _ttl():
+    return current_app.config.get('IDEMPOTENCY_KEY_TTL', 24 * 3600)
+
+
+def _pending_lease():
+    return current_app.config.get('IDEMPOTENCY_PENDING_LEASE', 60)
+
+
+def _fingerprint():
+    """Hash of the request, so a key reused for a different request is rejected"""
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _hot_cache_get(key):
+    with _hot_cache_lock:
+        entry = _hot_cache.get(key)
+        if entry is None:
+            return None
+        if entry['expires'] <= time.time():
+            del _hot_cache[key]
+            return None
+        _hot_cache.move_to_end(key)
+        return entry
+
+
+def _entry(fingerprint, status_code, body, expires_at):
+    return {
+        'fingerprint': fingerprint,
+        'status_code': status_code,
+        'body': body,
+        'expires': expires_at.replace(tzinfo=timezone.utc).timestamp()  # stored as naive UTC
+    }
+
+
+def _hot_cache_put(key, entry):
+    with _hot_cache_lock:
+        _hot_cache[key] = entry
+        _hot_cache.move_to_end(key)
+        while len(_hot_cache) > HOT_CACHE_SIZE:
+            _hot_cache.popitem(last=False)
+
+
+def _replay(entry, fingerprint):
+    if entry['fingerprint'] != fingerprint:
+        return jsonify({'error': 'Idempotency-Key was already used for a different request',
+                        'code': 'idempotency_key_reused'}), 422
+    response = Response(entry['body'], status=entry['status_code'], mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(key, fingerprint):
+    """Insert a pending row for key, or take over an expired one; False if someone else holds it.
+    A pending row only holds the key for a short lease, so a claim left behind by a crashed
+    worker or a failed _complete stops blocking retries after a minute instead of a day."""
+    now = datetime.utcnow()
+    stmt = insert(keys).values(
+        key=key, fingerprint=fingerprint, created_at=now, expires_at=now + timedelta(seconds=_pending_lease())
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[keys.c.key],
+        set_={'fingerprint': stmt.excluded.fingerprint, 'status_code': None, 'response_body': None,
+              'created_at': stmt.excluded.created_at, 'expires_at': stmt.excluded.expires_at},
+        where=keys.c.expires_at < now
+    )
+    claimed = db.session.execute(stmt).rowcount == 1
+    db.session.commit()
+    return claimed
+
+
+def _complete(key, cache_key, fingerprint, response):
+    if response.status_code >= 500:
+        # Release the key so a retry runs the handler again
+        db.session.execute(keys.delete().where(keys.c.key == key))
+        db.session.commit()
+        return
+    body = response.get_data(as_text=True)
+    expires_at = datetime.utcnow() + timedelta(seconds=_ttl())
+    db.session.execute(
+        keys.update().where(keys.c.key == key)
+        .values(status_code=response.status_code, response_body=body, expires_at=expires_at)
+    )
+    db.session.commit()
+    _hot_cache_put(cache_key, _entry(fingerprint, response.status_code, body, expires_at))
+
+
+def purge_expired_keys(batch_size=PURGE_BATCH_SIZE, max_batches=None):
+    """Delete expired keys in batches, up to max_batches if given; returns the number removed"""
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        expired = select(keys.c.key).where(keys.c.expires_at < datetime.utcnow()).limit(batch_size)
+        removed = db.session.execute(keys.delete().where(keys.c.key.in_(expired))).rowcount
+        db.session.commit()
+        total += removed
+        batches += 1
+        if removed < batch_size:
+            break
+    return total
+
+
+def _maybe_purge():
+    # One bounded batch per interval, so a client's POST never pays for a large
+    # backlog; the purge-idempotency-keys command clears the rest
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = now
+    purge_expired_keys(max_batches=1)
+
+
+def idempotent(view):
+    """Make a POST handler retry-safe when the client sends an Idempotency-Key header"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        fingerprint = _fingerprint()
+        cache_key = (current_campus(), key)
+        entry = _hot_cache_get(cache_key)
+        if entry:
+            return _replay(entry, fingerprint)
+
+        try:
+            _maybe_purge()
+            if not _claim(key, fingerprint):
+                record = db.session.get(IdempotencyKey, key)
+                if record is None or record.status_code is None:
+                    return jsonify({'error': 'A request with this Idempotency-Key is still being processed',
+                                    'code': 'idempotency_key_in_progress'}), 409
+                entry = _entry(record.fingerprint, record.status_code, record.response_body, record.expires_at)
+                _hot_cache_put(cache_key, entry)
+                return _replay(entry, fingerprint)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+
+        response = make_response(view(*args, **kwargs))
+        try:
+            _complete(key, cache_key, fingerprint, response)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Could not store response for Idempotency-Key %s", key)
+        return response
+    return wrapper
+
+
+@click.command('purge-idempotency-keys')
+@with_appcontext
+def purge_idempotency_keys_command():
+    """Delete expired Idempotency-Key records"""
+    click.echo(f"Purged {purge_expired_keys()} expired idempotency keys")
@@ -0,0 +1,433 @@
+# models.py - SQLAlchemy models for UENR Student Management System
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+from datetime import datetime
+
+from extensions import db
+
+
+# Models
+class Department(db.Model):
+    __tablename__ = 'departments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    code = db.Column(db.String(10), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    courses = db.relationship('Course', backref='department', lazy=True)
+    programs = db.relationship('Program', backref='department', lazy=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'code': self.code,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class Program(db.Model):
+    __tablename__ = 'programs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    code = db.Column(db.String(20), nullable=False, unique=True)
+    degree_type = db.Column(db.String(50), nullable=False)  # BSc, MSc, PhD
+    duration_years = db.Column(db.Integer, nullable=False, default=4)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    students = db.relationship('Student', backref='program', lazy=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'code': self.code,
+            'degree_type': self.degree_type,
+            'duration_years': self.duration_years,
+            'department_id': self.department_id,
+            'department_name': self.department.name if self.department else None,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class Student(db.Model):
+    __tablename__ = 'students'
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.String(20), nullable=False, unique=True)
+    first_name = db.Column(db.String(50), nullable=False)
+    last_name = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(120), nullable=False, unique=True)
+    phone = db.Column(db.String(20))
+    program_id = db.Column(db.Integer, db.ForeignKey('programs.id'), nullable=False)
+    level = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='Active')
+    admission_date = db.Column(db.Date, default=datetime.utcnow().date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    enrollments = db.relationship('Enrollment', backref='student', lazy=True, cascade='all, delete-orphan')
+    grades = db.relationship('Grade', backref='student', lazy=True)
+
+    # Covering indexes for dropdown options: the default opclass serves the
+    # ORDER BY student_id listing as an index-only scan, and varchar_pattern_ops
+    # serves prefix LIKE searches, which the default opclass cannot under a
+    # non-C collation
+    __table_args__ = (
+        db.Index('ix_students_options', 'student_id',
+                 postgresql_include=['id', 'first_name', 'last_name']),
+        db.Index('ix_students_options_prefix', 'student_id',
+                 postgresql_ops={'student_id': 'varchar_pattern_ops'},
+                 postgresql_include=['id', 'first_name', 'last_name']),
+    )
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'full_name': self.full_name,
+            'email': self.email,
+            'phone': self.phone,
+            'program_id': self.program_id,
+            'program_name': self.program.name if self.program else None,
+            'level': self.level,
+            'status': self.status,
+            'admission_date': self.admission_date.isoformat(),
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+
+class Instructor(db.Model):
+    __tablename__ = 'instructors'
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(20), nullable=False)  # Dr., Prof., etc.
+    first_name = db.Column(db.String(50), nullable=False)
+    last_name = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(120), nullable=False, unique=True)
+    phone = db.Column(db.String(20))
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    courses = db.relationship('Course', backref='instructor', lazy=True)
+
+    @property
+    def full_name(self):
+        return f"{self.title} {self.first_name} {self.last_name}"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'full_name': self.full_name,
+            'email': self.email,
+            'phone': self.phone,
+            'department_id': self.department_id,
+            'department_name': self.department.name if self.department else None,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class Course(db.Model):
+    __tablename__ = 'courses'
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_code = db.Column(db.String(20), nullable=False, unique=True)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    credits = db.Column(db.Integer, nullable=False, default=3)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
+    instructor_id = db.Column(db.Integer, db.ForeignKey('instructors.id'))
+    level = db.Column(db.Integer, nullable=False)  # 100, 200, 300, etc.
+    semester = db.Column(db.String(20), nullable=False, default='First')
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    enrollments = db.relationship('Enrollment', backref='course', lazy=True, cascade='all, delete-orphan')
+    grades = db.relationship('Grade', backref='course', lazy=True)
+    prerequisites = db.relationship(
+        'Course',
+        secondary='course_prerequisites',
+        primaryjoin='Course.id==course_prerequisites.c.course_id',
+        secondaryjoin='Course.id==course_prerequisites.c.prerequisite_id',
+        backref='dependent_courses'
+    )
+
+    # Partial indexes over active courses only; soft-deleted rows never match.
+    # As for students, one covering index per opclass: ordered listing and prefix search
+    __table_args__ = (
+        db.Index('ix_courses_options', 'course_code',
+                 postgresql_include=['id', 'title'],
+                 postgresql_where=db.text('is_active')),
+        db.Index('ix_courses_options_prefix', 'course_code',
+                 postgresql_ops={'course_code': 'varchar_pattern_ops'},
+                 postgresql_include=['id', 'title'],
+                 postgresql_where=db.text('is_active')),
+        db.Index('ix_courses_active_department', 'department_id', 'course_code',
+                 postgresql_where=db.text('is_active')),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'course_code': self.course_code,
+            'title': self.title,
+            'description': self.description,
+            'credits': self.credits,
+            'department_id': self.department_id,
+            'department_name': self.department.name if self.department else None,
+            'instructor_id': self.instructor_id,
+            'instructor_name': self.instructor.full_name if self.instructor else None,
+            'level': self.level,
+            'semester': self.semester,
+            'is_active': self.is_active,
+            'enrolled_count': self.enrolled_count,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+
+# Association table for course prerequisites
+course_prerequisites = db.Table('course_prerequisites',
+                                db.Column('course_id', db.Integer, db.ForeignKey('courses.id'), primary_key=True),
+                                db.Column('prerequisite_id', db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+                                )
+
+
+class Enrollment(db.Model):
+    __tablename__ = 'enrollments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    semester = db.Column(db.String(20), nullable=False)
+    academic_year = db.Column(db.String(10), nullable=False)
+    enrollment_date = db.Column(db.Date, default=datetime.utcnow().date)
+    status = db.Column(db.String(20), default='Enrolled')  # Enrolled, Completed, Dropped, etc.
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Unique constraint to prevent duplicate enrollments
+    __table_args__ = (db.UniqueConstraint('student_id', 'course_id', 'semester', 'academic_year'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'student_name': self.student.full_name if self.student else None,
+            'course_id': self.course_id,
+            'course_code': self.course.course_code if self.course else None,
+            'course_title': self.course.title if self.course else None,
+            'semester': self.semester,
+            'academic_year': self.academic_year,
+            'enrollment_date': self.enrollment_date.isoformat(),
+            'status': self.status,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+# Count enrollments in SQL instead of loading every enrollment row per course
+Course.enrolled_count = db.column_property(
+    db.select(db.func.count(Enrollment.id))
+    .where(Enrollment.course_id == Course.id)
+    .correlate_except(Enrollment)
+    .scalar_subquery()
+)
+
+
+class Grade(db.Model):
+    __tablename__ = 'grades'
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    semester = db.Column(db.String(20), nullable=False)
+    academic_year = db.Column(db.String(10), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    grade = db.Column(db.String(5), nullable=False)  # A+, A, B+, B, etc.
+    grade_points = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Unique constraint
+    __table_args__ = (db.UniqueConstraint('student_id', 'course_id', 'semester', 'academic_year'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'student_id': self.student_id,
+            'student_name': self.student.full_name if self.student else None,
+            'course_id': self.course_id,
+            'course_code': self.course.course_code if self.course else None,
+            'course_title': self.course.title if self.course else None,
+            'semester': self.semester,
+            'academic_year': self.academic_year,
+            'score': self.score,
+            'grade': self.grade,
+            'grade_points': self.grade_points,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+
+# Archive tables for inactive courses and old enrollments (see archive.py)
+class CourseArchive(db.Model):
+    __tablename__ = 'courses_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_code = db.Column(db.String(20), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    credits = db.Column(db.Integer, nullable=False)
+    department_id = db.Column(db.Integer, nullable=False)
+    instructor_id = db.Column(db.Integer)
+    level = db.Column(db.Integer, nullable=False)
+    semester = db.Column(db.String(20), nullable=False)
+    is_active = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class EnrollmentArchive(db.Model):
+    __tablename__ = 'enrollments_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, nullable=False, index=True)
+    course_id = db.Column(db.Integer, nullable=False, index=True)
+    semester = db.Column(db.String(20), nullable=False)
+    academic_year = db.Column(db.String(10), nullable=False)
+    enrollment_date = db.Column(db.Date)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Change history written by audit.py
+class AuditLog(db.Model):
+    __tablename__ = 'audit_log'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    campus = db.Column(db.String(50))
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    changes = db.Column(db.JSON, nullable=False)  # {field: {'before': ..., 'after': ...}}
+    context = db.Column(db.String(200))  # e.g. "PUT /api/students/5"
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_audit_log_row', 'campus', 'table_name', 'row_id', 'id'),
+        db.Index('ix_audit_log_changed_at', 'changed_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'campus': self.campus,
+            'table_name': self.table_name,
+            'row_id': self.row_id,
+            'action': self.action,
+            'changes': self.changes,
+            'context': self.context,
+            'changed_at': self.changed_at.isoformat()
+        }
+
+
+# Stored responses for Idempotency-Key replays (see idempotency.py)
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+
+    key = db.Column(db.String(100), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status_code = db.Column(db.SmallInteger)  # NULL while the first request is in progress
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+# End-of-year promotion runs (see promotion.py). Each row is also the job
+# status that GET /api/jobs/<id> reports, so any worker can answer a poll.
+class PromotionRun(db.Model):
+    __tablename__ = 'promotion_runs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    campus = db.Column(db.String(50), nullable=False)
+    academic_year = db.Column(db.String(10), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # running, completed, failed
+    progress = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    # One run per campus and academic year; only a failed run may be retried
+    __table_args__ = (db.UniqueConstraint('campus', 'academic_year'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'campus': self.campus,
+            'academic_year': self.academic_year,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Soft-delete filter: inactive courses are hidden from every ORM query and
+# from course collections such as Department.courses and Instructor.courses.
+# Many-to-one references (Enrollment.course, Grade.course) still load an
+# inactive course, so existing records keep showing it.
+# Statements opt out with .execution_options(include_inactive=True).
+ACTIVE_COURSES = with_loader_criteria(Course, lambda cls: cls.is_active == True, include_aliases=True,
+                                      propagate_to_loaders=False)
+
+
+def active_courses_only(stmt):
+    """
+    Apply the soft-delete filter to stmt up front and mark it so the hook
+    leaves it alone. The hook's .options() call builds a new statement on
+    every execution, so reused statements (see statements.py) would lose
+    their memoized cache key.
+    """
+    return stmt.options(ACTIVE_COURSES).execution_options(active_courses_only=True)
+
+
+def _loads_course_reference(execute_state):
+    path = execute_state.loader_strategy_path
+    prop = path[-1] if path is not None and len(path) else None
+    return getattr(prop, 'uselist', None) is False
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _filter_inactive_courses(execute_state):
+    options = execute_state.execution_options
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not options.get('include_inactive', False)
+        and not options.get('active_courses_only', False)
+        and not (execute_state.is_relationship_load and _loads_course_reference(execute_state))
+    ):
+        execute_state.statement = execute_state.statement.options(ACTIVE_COURSES)
@@ -0,0 +1,267 @@
+"""
+End-of-year student promotion for UENR Student Management System
+Students below their program's final level move up 100; students at or above
+it are marked Graduated. The final level is the degree's entry level plus
+(duration_years - 1) * 100, and each degree type is handled by two set-based
+UPDATE ... FROM statements inside one transaction. A campus is promoted at
+most once per academic year: the transaction holds an advisory lock for the
+campus and records the run in promotion_runs before it commits. Each changed
+student gets an audit_log entry, built from the UPDATEs' RETURNING rows and
+committed with the promotion.
+"""
+
+import re
+import threading
+import uuid
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, case, distinct, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from extensions import db
+from models import AuditLog, Program, PromotionRun, Student
+from tenancy import current_campus, use_campus
+
+students = Student.__table__
+programs = Program.__table__
+runs = PromotionRun.__table__
+
+SAMPLE_SIZE = 20
+ACADEMIC_YEAR = re.compile(r'^\d{4}/\d{4}$')  # e.g. 2024/2025, as in enrollments
+
+
+class PromotionRefused(Exception):
+    """The promotion may not run; code is the API error code"""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+def _campus():
+    return current_campus() or current_app.config.get('DEFAULT_CAMPUS', 'main')
+
+
+def _rules():
+    config = current_app.config
+    entry_levels = config.get('PROMOTION_ENTRY_LEVELS', {'BSc': 100, 'MSc': 500, 'PhD': 700})
+    entry = case(entry_levels, value=programs.c.degree_type, else_=100) if entry_levels else literal(100)
+    final_level = entry + (programs.c.duration_years - 1) * 100
+    statuses = config.get('PROMOTION_STATUSES', ('Active', 'Thesis', 'Research'))
+    eligible = and_(students.c.program_id == programs.c.id, students.c.status.in_(statuses))
+    return final_level, eligible, config.get('PROMOTION_GRADUATED_STATUS', 'Graduated')
+
+
+def preview_promotion():
+    """Dry-run diff: counts per program and current level, and a sample of affected students"""
+    final_level, eligible, graduated = _rules()
+    graduating = students.c.level >= final_level
+    action = case((graduating, 'graduate'), else_='promote').label('action')
+    new_level = case((graduating, students.c.level), else_=students.c.level + 100).label('new_level')
+    new_status = case((graduating, graduated), else_=students.c.status).label('new_status')
+
+    summary = db.session.execute(
+        select(programs.c.code, programs.c.degree_type, students.c.level, action,
+               func.count().label('students'))
+        .where(eligible)
+        .group_by(programs.c.code, programs.c.degree_type, students.c.level, action)
+        .order_by(programs.c.code, students.c.level)
+    ).all()
+    sample = db.session.execute(
+        select(students.c.id, students.c.student_id, programs.c.code.label('program'),
+               students.c.level, students.c.status, new_level, new_status)
+        .where(eligible)
+        .order_by(students.c.id)
+        .limit(SAMPLE_SIZE)
+    ).all()
+
+    return {
+        'summary': [dict(row._mapping) for row in summary],
+        'totals': {
+            'promote': sum(row.students for row in summary if row.action == 'promote'),
+            'graduate': sum(row.students for row in summary if row.action == 'graduate')
+        },
+        'sample': [dict(row._mapping) for row in sample]
+    }
+
+
+def run_promotion(academic_year, run_id=None, progress=None):
+    """
+    Apply the promotion for academic_year in one transaction; returns counts per
+    degree type. Raises PromotionRefused if another promotion holds the campus
+    lock or academic_year has already been promoted.
+    """
+    campus = _campus()
+    run_id = run_id or uuid.uuid4().hex
+    now = datetime.utcnow()
+    context = f'promotion {run_id} ({academic_year})'
+    result = {}
+    try:
+        # Released at commit or rollback; try_ so a second run fails fast instead of queueing
+        locked = db.session.execute(
+            select(func.pg_try_advisory_xact_lock(func.hashtext(f'promotion:{campus}')))
+        ).scalar()
+        if not locked:
+            raise PromotionRefused('Another promotion is running for this campus', 'promotion_running')
+        completed = db.session.execute(
+            select(runs.c.id).where(runs.c.campus == campus, runs.c.academic_year == academic_year,
+                                    runs.c.status == 'completed')
+        ).first()
+        if completed:
+            raise PromotionRefused(f'Students have already been promoted for {academic_year}',
+                                   'already_promoted')
+
+        final_level, eligible, graduated = _rules()
+        # Joined back to itself so RETURNING sees each row's status before the update
+        previous = students.alias('previous')
+        degree_types = db.session.execute(select(distinct(programs.c.degree_type))).scalars().all()
+        for step, degree_type in enumerate(degree_types, 1):
+            of_type = and_(eligible, programs.c.degree_type == degree_type)
+            # Graduate first so finishing students are not also promoted
+            graduated_rows = db.session.execute(
+                update(students)
+                .where(of_type, students.c.id == previous.c.id, students.c.level >= final_level)
+                .values(status=graduated, updated_at=now)
+                .returning(students.c.id, previous.c.status)
+            ).all()
+            promoted_rows = db.session.execute(
+                update(students)
+                .where(of_type, students.c.level < final_level)
+                .values(level=students.c.level + 100, updated_at=now)
+                .returning(students.c.id, students.c.level)
+            ).all()
+            _audit(
+                [(row.id, {'status': {'before': row.status, 'after': graduated}}) for row in graduated_rows] +
+                [(row.id, {'level': {'before': row.level - 100, 'after': row.level}}) for row in promoted_rows],
+                campus, context, now
+            )
+            result[degree_type] = {'promoted': len(promoted_rows), 'graduated': len(graduated_rows)}
+            if progress:
+                progress(step, len(degree_types), degree_type, result[degree_type])
+
+        # Recorded in the same transaction, so a committed promotion is always on record
+        record = insert(runs).values(id=run_id, campus=campus, academic_year=academic_year,
+                                     status='completed', result=result, started_at=now,
+                                     finished_at=datetime.utcnow())
+        db.session.execute(record.on_conflict_do_update(
+            index_elements=[runs.c.campus, runs.c.academic_year],
+            set_={'status': 'completed', 'result': record.excluded.result, 'error': None,
+                  'finished_at': record.excluded.finished_at}
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result
+
+
+def _audit(changes, campus, context, changed_at):
+    """Insert audit_log rows for (student id, changes) pairs in the session's transaction.
+    Bound through the AuditLog mapper so they reach the main database, where the
+    log is kept; with a campus on its own engine they commit alongside it."""
+    if not changes:
+        return
+    db.session.execute(
+        AuditLog.__table__.insert(),
+        [{'campus': campus, 'table_name': 'students', 'row_id': row_id, 'action': 'update',
+          'changes': row_changes, 'context': context, 'changed_at': changed_at}
+         for row_id, row_changes in changes],
+        bind_arguments={'mapper': AuditLog.__mapper__}
+    )
+
+
+def _update_run(run_id, **values):
+    """Update a job's row outside the promotion's transaction, so polls see it immediately.
+    Only a running job is updated, so a failure never overwrites a completed run."""
+    engine = db.session.get_bind(PromotionRun.__mapper__)
+    with engine.begin() as conn:
+        conn.execute(update(runs).where(runs.c.id == run_id, runs.c.status == 'running').values(**values))
+
+
+def start_promotion_job(academic_year):
+    """
+    Run the promotion in a background thread; returns the job id, or None if a
+    run for this campus and academic year is already running or has completed.
+    The job's row is its state, so any worker can report on it.
+    """
+    app = current_app._get_current_object()
+    campus = _campus()
+    run_id = uuid.uuid4().hex
+    claim = insert(runs).values(id=run_id, campus=campus, academic_year=academic_year, status='running',
+                                started_at=datetime.utcnow())
+    claim = claim.on_conflict_do_update(
+        index_elements=[runs.c.campus, runs.c.academic_year],
+        set_={'id': claim.excluded.id, 'status': 'running', 'progress': None, 'result': None, 'error': None,
+              'started_at': claim.excluded.started_at, 'finished_at': None},
+        where=runs.c.status == 'failed'
+    )
+    claimed = db.session.execute(claim).rowcount == 1
+    db.session.commit()
+    if not claimed:
+        return None
+
+    def report(step, steps, degree_type, counts):
+        _update_run(run_id, progress={'step': step, 'steps': steps, 'degree_type': degree_type, **counts})
+
+    def run():
+        with app.app_context(), use_campus(campus):
+            try:
+                run_promotion(academic_year, run_id=run_id, progress=report)
+            except Exception as e:
+                try:
+                    _update_run(run_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+                except Exception:
+                    app.logger.exception("Could not record failure of promotion job %s", run_id)
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, name=f'promotion-{run_id}', daemon=True).start()
+    return run_id
+
+
+def get_job(job_id):
+    """Status of a promotion job started by any worker"""
+    run = db.session.get(PromotionRun, job_id)
+    return run.to_dict() if run else None
+
+
+def get_run(academic_year):
+    """The current campus's run for academic_year, if any"""
+    run = PromotionRun.query.filter_by(campus=_campus(), academic_year=academic_year).first()
+    return run.to_dict() if run else None
+
+
+@click.command('promote-students')
+@click.option('--academic-year', required=True, help='Academic year being closed, e.g. 2024/2025')
+@click.option('--dry-run', is_flag=True, help='Show what would change without writing')
+@click.option('--campus', help='Campus to promote (defaults to DEFAULT_CAMPUS)')
+@with_appcontext
+def promote_students_command(academic_year, dry_run, campus):
+    """Advance every student one level and graduate those who have finished"""
+    if not ACADEMIC_YEAR.match(academic_year):
+        raise click.BadParameter('expected YYYY/YYYY', param_hint='--academic-year')
+    with use_campus(campus):
+        run = get_run(academic_year)
+        if run and run['status'] == 'completed':
+            raise click.ClickException(f"Students have already been promoted for {academic_year} "
+                                       f"(run {run['id']}, finished {run['finished_at']})")
+        preview = preview_promotion()
+        for row in preview['summary']:
+            click.echo(f"  {row['code']:<10}{row['degree_type']:<6}level {row['level']:<6}"
+                       f"{row['action']:<10}{row['students']:>8}")
+        click.echo(f"To promote: {preview['totals']['promote']}, to graduate: {preview['totals']['graduate']}")
+        if dry_run:
+            return
+
+        def report(step, steps, degree_type, counts):
+            click.echo(f"[{step}/{steps}] {degree_type}: promoted {counts['promoted']}, "
+                       f"graduated {counts['graduated']}")
+
+        try:
+            run_promotion(academic_year, progress=report)
+        except PromotionRefused as e:
+            raise click.ClickException(str(e))
+        click.echo("Promotion committed")
@@ -0,0 +1,134 @@
+"""
+Prebuilt statements for the hot API queries
+Each query shape is built once as a select() with bindparam() placeholders
+and reused, so requests only bind values: the statement's cache key is
+memoized, SQLAlchemy's compiled cache is hit, and with psycopg 3 the
+driver prepares the SQL server-side after a few executions. Every statement
+is wrapped in active_courses_only() so the soft-delete hook leaves it as is.
+"""
+
+import functools
+import math
+
+from sqlalchemy import Integer, bindparam, func, or_, select
+
+from extensions import db
+from models import Department, Program, Student, Instructor, Course, Enrollment, Grade, active_courses_only
+
+LIMIT = bindparam('limit', type_=Integer)
+OFFSET = bindparam('offset', type_=Integer)
+
+
+def like_prefix(value):
+    """LIKE pattern matching strings that start with value, escaped for use with escape='\\'"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def like_contains(value):
+    return '%' + like_prefix(value)
+
+
+# Fixed-shape lookups
+PROGRAMS = active_courses_only(select(Program).order_by(Program.name))
+DEPARTMENTS = active_courses_only(select(Department).order_by(Department.name))
+INSTRUCTORS = active_courses_only(select(Instructor).order_by(Instructor.last_name))
+RECENT_STUDENTS = active_courses_only(select(Student).order_by(Student.created_at.desc()).limit(5))
+RECENT_COURSES = active_courses_only(select(Course).order_by(Course.created_at.desc()).limit(5))
+
+STUDENT_OPTIONS = active_courses_only(
+    select(Student.id, Student.student_id, Student.first_name, Student.last_name)
+    .order_by(Student.student_id).limit(LIMIT)
+)
+STUDENT_OPTIONS_BY_PREFIX = active_courses_only(
+    select(Student.id, Student.student_id, Student.first_name, Student.last_name)
+    .where(Student.student_id.like(bindparam('pattern'), escape='\\'))
+    .order_by(Student.student_id).limit(LIMIT)
+)
+COURSE_OPTIONS = active_courses_only(
+    select(Course.id, Course.course_code, Course.title)
+    .order_by(Course.course_code).limit(LIMIT)
+)
+COURSE_OPTIONS_BY_PREFIX = active_courses_only(
+    select(Course.id, Course.course_code, Course.title)
+    .where(Course.course_code.like(bindparam('pattern'), escape='\\'))
+    .order_by(Course.course_code).limit(LIMIT)
+)
+
+
+# Filter chains: one statement per combination of filters in use
+@functools.lru_cache(maxsize=None)
+def student_list(search, program):
+    stmt = select(Student)
+    if search:
+        pattern = bindparam('pattern')
+        stmt = stmt.where(or_(
+            Student.first_name.ilike(pattern, escape='\\'),
+            Student.last_name.ilike(pattern, escape='\\'),
+            Student.student_id.ilike(pattern, escape='\\'),
+            Student.email.ilike(pattern, escape='\\')
+        ))
+    if program:
+        stmt = stmt.where(Student.program_id == bindparam('program_id'))
+    return _paged(stmt, Student.created_at.desc())
+
+
+@functools.lru_cache(maxsize=None)
+def course_list(search, department):
+    stmt = select(Course)
+    if search:
+        pattern = bindparam('pattern')
+        stmt = stmt.where(or_(
+            Course.course_code.ilike(pattern, escape='\\'),
+            Course.title.ilike(pattern, escape='\\')
+        ))
+    if department:
+        stmt = stmt.where(Course.department_id == bindparam('department_id'))
+    return _paged(stmt, Course.course_code)
+
+
+@functools.lru_cache(maxsize=None)
+def enrollment_list(student, course):
+    stmt = select(Enrollment)
+    if student:
+        stmt = stmt.where(Enrollment.student_id == bindparam('student_id'))
+    if course:
+        stmt = stmt.where(Enrollment.course_id == bindparam('course_id'))
+    return active_courses_only(stmt.order_by(Enrollment.created_at.desc()))
+
+
+@functools.lru_cache(maxsize=None)
+def grade_list(student, course):
+    stmt = select(Grade)
+    if student:
+        stmt = stmt.where(Grade.student_id == bindparam('student_id'))
+    if course:
+        stmt = stmt.where(Grade.course_id == bindparam('course_id'))
+    return active_courses_only(stmt.order_by(Grade.created_at.desc()))
+
+
+def _paged(stmt, order_by):
+    """(count statement, page statement) for a filtered select"""
+    stmt = active_courses_only(stmt)
+    count = active_courses_only(select(func.count()).select_from(stmt.subquery()))
+    page = stmt.order_by(order_by).limit(LIMIT).offset(OFFSET)
+    return count, page
+
+
+def paginate(statements, params, page, per_page):
+    """Run a (count, page) pair and return the items with Flask-SQLAlchemy style paging fields"""
+    count_stmt, page_stmt = statements
+    page = max(page, 1)
+    per_page = max(per_page, 1)
+    total = db.session.execute(count_stmt, params).scalar()
+    items = db.session.execute(
+        page_stmt, {**params, 'limit': per_page, 'offset': (page - 1) * per_page}
+    ).scalars().all()
+    pages = math.ceil(total / per_page) if total else 0
+    return {
+        'items': items,
+        'total': total,
+        'pages': pages,
+        'current_page': page,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
@@ -0,0 +1,153 @@
+"""
+Multi-campus support for UENR Student Management System
+Each campus key maps to its own schema in the main database or to its own
+database URL, and gets its own engine and connection pool. Requests pick a
+campus with the X-Campus header (or ?campus=); the session routes every
+query to that campus's engine.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import click
+from flask import current_app, g, has_app_context, jsonify, request
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine, text
+
+HEADER = 'X-Campus'
+
+# Tables kept only in the main database rather than per campus
+CENTRAL_TABLES = {'audit_log'}
+
+
+class TenantSession(FlaskSession):
+    """Session that binds to the current campus's engine, except for central tables"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        central = mapper is not None and getattr(mapper, 'persist_selectable', None) is not None \
+            and mapper.persist_selectable.name in CENTRAL_TABLES
+        if bind is None and not central:
+            engine = campus_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class CampusRegistry:
+    def __init__(self, app):
+        self.app = app
+        self.campuses = dict(app.config.get('CAMPUSES') or {})
+        self.default = app.config.get('DEFAULT_CAMPUS', 'main')
+        self.campuses.setdefault(self.default, {})
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def engine_for(self, campus):
+        """Engine for campus, created on first use; None means the app's default engine"""
+        if campus == self.default and not self.campuses[campus]:
+            return None
+        engine = self._engines.get(campus)
+        if engine is not None:
+            return engine
+        with self._lock:
+            if campus not in self._engines:
+                self._engines[campus] = self._create_engine(self.campuses[campus])
+            return self._engines[campus]
+
+    def _create_engine(self, options):
+        engine_options = dict(self.app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        url = options.get('url') or self.app.config['SQLALCHEMY_DATABASE_URI']
+        if options.get('schema'):
+            # Unqualified tables resolve to the campus schema, so the models stay schema-agnostic
+            engine_options['execution_options'] = {'schema_translate_map': {None: options['schema']}}
+        return create_engine(url, **engine_options)
+
+    def dispose_after_fork(self):
+        for engine in list(self._engines.values()):
+            engine.dispose(close=False)
+
+
+def registry():
+    return current_app.extensions['campuses']
+
+
+def current_campus():
+    """Campus key of the current request or use_campus() block"""
+    if not has_app_context() or 'campuses' not in current_app.extensions:
+        return None
+    return g.get('campus') or registry().default
+
+
+def campus_engine():
+    campus = current_campus()
+    return registry().engine_for(campus) if campus else None
+
+
+@contextmanager
+def use_campus(campus):
+    """Route queries in this block to campus (for CLI commands and fan-out workers)"""
+    previous = g.get('campus')
+    g.campus = campus
+    try:
+        yield
+    finally:
+        g.campus = previous
+
+
+def _select_campus():
+    campus = request.headers.get(HEADER) or request.args.get('campus')
+    if campus is None:
+        return None
+    if campus not in registry().campuses:
+        return jsonify({'error': f'Unknown campus: {campus}', 'code': 'unknown_campus'}), 404
+    g.campus = campus
+    return None
+
+
+def fan_out(func, campuses=None, max_workers=8):
+    """
+    Run func() once per campus in parallel threads, each with its own app
+    context and session, and return {campus: result}
+    """
+    from extensions import db
+
+    app = current_app._get_current_object()
+    campuses = list(campuses or registry().campuses)
+
+    def run(campus):
+        with app.app_context(), use_campus(campus):
+            try:
+                return func()
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(campuses)) or 1) as pool:
+        return dict(zip(campuses, pool.map(run, campuses)))
+
+
+def init_tenancy(app):
+    app.extensions['campuses'] = CampusRegistry(app)
+    app.before_request(_select_campus)
+
+
+@click.command('create-campus')
+@click.argument('campus')
+@with_appcontext
+def create_campus_command(campus):
+    """Create the schema (if any) and tables for a configured campus"""
+    from extensions import db
+
+    campuses = registry().campuses
+    if campus not in campuses:
+        raise click.ClickException(f"Campus {campus!r} is not in CAMPUSES")
+    with use_campus(campus):
+        engine = campus_engine() or db.engine
+        schema = campuses[campus].get('schema')
+        with engine.begin() as conn:
+            if schema:
+                conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+            tables = [t for t in db.metadata.sorted_tables if t.name not in CENTRAL_TABLES]
+            db.metadata.create_all(conn, tables=tables)
+    click.echo(f"Campus {campus} is ready")